@@ -112,3 +112,15 @@ STATIC_ROOT = BASE_DIR / 'static/'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Shared by every worker process: cached totals are invalidated by bumping a
+# version key, which a per-process LocMemCache would only bump in one worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TrackConfig(AppConfig):
     name = "track"
+
+    def ready(self):
+        from track import signals  # noqa: F401
@@ -0,0 +1,111 @@
+import hashlib
+
+import orjson
+
+from django.core.cache import cache
+from django.db import transaction
+
+from track.models import PaymentMethod
+
+PAYMENT_METHODS_KEY = 'payment_methods_all'
+PAYMENT_METHODS_TIMEOUT = 60 * 60
+
+TRANSACTIONS_VERSION_KEY = 'transactions_version'
+TRANSACTION_STATS_TIMEOUT = 5 * 60
+TRANSACTION_FILTERS = ('type', 'method', 'date_from', 'date_to', 'currency')
+DASHBOARD_TOTALS_TIMEOUT = 60 * 60
+
+WAREHOUSE_ITEMS_VERSION_KEY = 'warehouse_items_version'
+WAREHOUSE_ITEMS_KEY = 'warehouse:items:v1:%s'
+WAREHOUSE_ITEMS_TIMEOUT = 5 * 60
+
+
+def payment_methods():
+    """All payment methods, cached until one is saved or deleted"""
+    methods = cache.get(PAYMENT_METHODS_KEY)
+    if methods is None:
+        methods = list(PaymentMethod.objects.all())
+        cache.set(PAYMENT_METHODS_KEY, methods, PAYMENT_METHODS_TIMEOUT)
+    return methods
+
+
+def invalidate_payment_methods():
+    cache.delete(PAYMENT_METHODS_KEY)
+
+
+def transactions_version():
+    return cache.get_or_set(TRANSACTIONS_VERSION_KEY, 1, None)
+
+
+def bump_transactions_version():
+    cache.add(TRANSACTIONS_VERSION_KEY, 1, None)
+    cache.incr(TRANSACTIONS_VERSION_KEY)
+
+
+def invalidate_transactions():
+    """Make every cached transaction aggregate stale once the surrounding transaction commits.
+
+    A bump before commit would let a reader cache pre-commit totals under the new version.
+    """
+    transaction.on_commit(bump_transactions_version)
+
+
+def transaction_stats(params, compute):
+    """Stats for the given filter params, cached until any transaction changes"""
+    filters = orjson.dumps([params.get(name) for name in TRANSACTION_FILTERS])
+    key = 'transaction_stats:%s:%s' % (
+        transactions_version(),
+        hashlib.sha1(filters).hexdigest(),
+    )
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, TRANSACTION_STATS_TIMEOUT)
+    return stats
+
+
+def dashboard_totals(date_from, compute):
+    """Dashboard currency totals since date_from, cached until any transaction changes"""
+    key = 'dashboard_totals:%s:%s' % (transactions_version(), date_from.isoformat())
+    totals = cache.get(key)
+    if totals is None:
+        totals = compute()
+        cache.set(key, totals, DASHBOARD_TOTALS_TIMEOUT)
+    return totals
+
+
+def warehouse_items_version():
+    return cache.get_or_set(WAREHOUSE_ITEMS_VERSION_KEY, 1, None)
+
+
+def cached_warehouse_items(version):
+    """Serialized warehouse item list bytes, or None until the next full render"""
+    return cache.get(WAREHOUSE_ITEMS_KEY % version)
+
+
+def cache_warehouse_items(chunks, version):
+    """Pass streamed response chunks through, caching the payload once the stream completes.
+
+    version must be read before the items are queried: a write that commits
+    mid-stream bumps it, so the late set lands under a key nobody reads.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(WAREHOUSE_ITEMS_KEY % version, b''.join(parts), WAREHOUSE_ITEMS_TIMEOUT)
+
+
+def bump_warehouse_items_version():
+    cache.add(WAREHOUSE_ITEMS_VERSION_KEY, 1, None)
+    cache.incr(WAREHOUSE_ITEMS_VERSION_KEY)
+
+
+def invalidate_warehouse_items():
+    """Bump the version once the surrounding transaction commits.
+
+    A bump before commit would let a reader cache pre-commit rows under the
+    new version; the version read before querying is what keeps a slower
+    reader's late set from landing on the live key.
+    """
+    transaction.on_commit(bump_warehouse_items_version)
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 from django.contrib.auth.models import User
 
+from .cache import payment_methods
 from .models import PaymentMethod, Transaction
 
 
@@ -19,6 +20,13 @@ class TransactionForm(forms.ModelForm):
             "method": forms.Select(attrs={"class": "input-field"}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Render the dropdown from the cached list instead of querying per form
+        self.fields["method"].choices = [("", "---------")] + [
+            (method.pk, method.name) for method in payment_methods()
+        ]
+
 
 class AdminUserCreateForm(UserCreationForm):
     class Meta:
@@ -0,0 +1,27 @@
+from django.db.models import CharField, Func
+
+
+class DotThousands(Func):
+    """Integer rendered with '.' thousand separators by the database, like |dot_thousands"""
+
+    template = "REPLACE(FORMAT(%(expressions)s, 0), ',', '.')"
+    output_field = CharField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="TRANSLATE(TO_CHAR(%(expressions)s, 'FM9,999,999,999,999,999,999'), ',', '.')",
+            **extra_context,
+        )
+
+    def as_oracle(self, compiler, connection, **extra_context):
+        return self.as_postgresql(compiler, connection, **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="REPLACE(PRINTF('%%%%,d', %(expressions)s), ',', '.')",
+            **extra_context,
+        )
@@ -0,0 +1,53 @@
+from functools import wraps
+
+import orjson
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse
+
+
+class ORJSONResponse(HttpResponse):
+    """Drop-in replacement for JsonResponse that encodes with orjson"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        # default=str renders Decimal values as strings; dates are native to orjson
+        super().__init__(orjson.dumps(data, default=str), **kwargs)
+
+
+def json_ok(data, status=200):
+    return ORJSONResponse(data, status=status)
+
+
+def json_err(message, status=400):
+    return ORJSONResponse({'success': False, 'error': message}, status=status)
+
+
+class JsonAuthMixin(LoginRequiredMixin):
+    """LoginRequiredMixin for API views: a 401 JSON error instead of a login redirect"""
+
+    def handle_no_permission(self):
+        return json_err('Authentication required', status=401)
+
+
+def staff_required_json(method):
+    """Reject non-staff users with a 403 JSON error before a view method runs"""
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return json_err('Permission denied. Only staff users can perform this action.', status=403)
+        return method(self, request, *args, **kwargs)
+
+    return wrapper
+
+
+def json_request_required(method):
+    """Reject request bodies that aren't JSON with a 415 before a view method runs"""
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if 'application/json' not in request.META.get('CONTENT_TYPE', ''):
+            return json_err('Expected an application/json body', status=415)
+        return method(self, request, *args, **kwargs)
+
+    return wrapper
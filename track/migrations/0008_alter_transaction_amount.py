@@ -0,0 +1,18 @@
+# Generated manually for 64-bit transaction amounts
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0007_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated manually for transaction type/currency check constraints
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0008_alter_transaction_amount'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.CheckConstraint(condition=models.Q(('type__in', ['income', 'expense'])), name='txn_type_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.CheckConstraint(condition=models.Q(('currency__in', ['uzs', 'usd', 'afn'])), name='txn_ccy_valid'),
+        ),
+    ]
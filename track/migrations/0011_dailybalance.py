@@ -0,0 +1,53 @@
+# Generated manually for the DailyBalance stats snapshot
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_daily_balances(apps, schema_editor):
+    Transaction = apps.get_model('track', 'Transaction')
+    DailyBalance = apps.get_model('track', 'DailyBalance')
+
+    totals = Transaction.objects.values('date', 'currency').annotate(
+        income=Coalesce(Sum('amount', filter=Q(type='income')), 0),
+        expense=Coalesce(Sum('amount', filter=Q(type='expense')), 0),
+    )
+    DailyBalance.objects.bulk_create(
+        (
+            DailyBalance(
+                date=row['date'],
+                currency=row['currency'],
+                income_total=row['income'],
+                expense_total=row['expense'],
+            )
+            for row in totals.iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0009_transaction_check_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('currency', models.CharField(choices=[('uzs', 'UZS'), ('usd', 'USD'), ('afn', 'AFN')], max_length=10)),
+                ('income_total', models.PositiveBigIntegerField(default=0)),
+                ('expense_total', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'daily_balances',
+                'ordering': ['-date', 'currency'],
+                'unique_together': {('date', 'currency')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated manually: balance is now computed from products and payments
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0011_dailybalance'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='monthlyentry',
+            name='balance',
+        ),
+    ]
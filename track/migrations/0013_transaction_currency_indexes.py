@@ -0,0 +1,21 @@
+# Generated manually for per-currency aggregate indexes
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0012_remove_monthlyentry_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['currency', 'type', 'amount'], name='txn_ccy_type_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'currency'], name='txn_date_ccy_idx'),
+        ),
+    ]
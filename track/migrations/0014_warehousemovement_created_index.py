@@ -0,0 +1,17 @@
+# Generated manually for the warehouse page's movement list
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0013_transaction_currency_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='warehousemovement',
+            index=models.Index(fields=['-created_at', 'item', 'type'], name='wh_move_created_idx'),
+        ),
+    ]
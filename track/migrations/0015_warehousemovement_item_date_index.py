@@ -0,0 +1,17 @@
+# Generated manually for per-item movement history ordered by date
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('track', '0014_warehousemovement_created_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='warehousemovement',
+            index=models.Index(fields=['item', '-date'], name='wm_item_date_desc_idx'),
+        ),
+    ]
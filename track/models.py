@@ -1,4 +1,9 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
 
@@ -34,7 +39,8 @@ class Transaction(models.Model):
     method = models.ForeignKey(
         PaymentMethod, on_delete=models.PROTECT, related_name="transactions"
     )
-    amount = models.PositiveIntegerField()
+    # Whole units as an integer (no Decimal); BIGINT so large UZS sums don't overflow
+    amount = models.PositiveBigIntegerField()
     description = models.CharField(max_length=255, blank=True)
 
     date = models.DateField()
@@ -43,6 +49,74 @@ class Transaction(models.Model):
     class Meta:
         db_table = "transactions"
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["-date", "type"], name="txn_date_type_idx"),
+            models.Index(fields=["method", "-date"], name="txn_method_date_idx"),
+            models.Index(fields=["type", "date"], name="txn_type_date_idx"),
+            # Trailing amount lets the per-currency SUMs run as index-only scans
+            models.Index(fields=["currency", "type", "amount"], name="txn_ccy_type_amount_idx"),
+            models.Index(fields=["date", "currency"], name="txn_date_ccy_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(type__in=["income", "expense"]),
+                name="txn_type_valid",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(currency__in=["uzs", "usd", "afn"]),
+                name="txn_ccy_valid",
+            ),
+        ]
+
+
+class DailyBalance(models.Model):
+    """Per-day, per-currency income/expense totals so stats don't sum the whole history"""
+
+    date = models.DateField()
+    currency = models.CharField(max_length=10, choices=Transaction.CURRENCY_CHOICES)
+    income_total = models.PositiveBigIntegerField(default=0)
+    expense_total = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = "daily_balances"
+        ordering = ["-date", "currency"]
+        unique_together = ("date", "currency")
+
+    def __str__(self):
+        return f"{self.date} {self.currency}: +{self.income_total} / -{self.expense_total}"
+
+    @classmethod
+    def apply_deltas(cls, rows):
+        """Add signed (date, currency, type, amount) rows to the day totals.
+
+        Deltas rather than recomputed sums, so concurrent writers to the same day
+        can't overwrite each other. Call inside the atomic block that writes the
+        transactions, so a failed snapshot write rolls them back too.
+        """
+        date_field = Transaction._meta.get_field("date")
+        deltas = defaultdict(int)
+        for date, currency, type, amount in rows:
+            column = "income_total" if type == Transaction.TYPE_INCOME else "expense_total"
+            deltas[(date_field.to_python(date), currency, column)] += amount
+
+        # Sorted so concurrent writers lock the day rows in the same order
+        for (date, currency, column), amount in sorted(deltas.items()):
+            if amount:
+                cls._add(date, currency, column, amount)
+
+    @classmethod
+    def _add(cls, date, currency, column, amount):
+        day = cls.objects.filter(date=date, currency=currency)
+        if day.update(**{column: F(column) + amount}):
+            return
+        try:
+            # First write for the day; the savepoint survives a concurrent first write
+            with transaction.atomic():
+                cls.objects.create(date=date, currency=currency, **{column: amount})
+        except IntegrityError:
+            # Lost the insert race (the UNIQUE conflict waits for the winner to commit)
+            if not day.update(**{column: F(column) + amount}):
+                raise
 
 
 class Employee(models.Model):
@@ -63,12 +137,53 @@ class Employee(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
+class MoneySumField(models.DecimalField):
+    """Output field for computed sums; SQLite returns them without the 2-place scale"""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return value.quantize(Decimal("0.01"))
+
+
+def entry_total(model, field):
+    """SUM(field) over a MonthlyEntry's products or payments as a correlated subquery
+
+    A subquery per relation avoids the products x payments row blow-up that
+    joining both reverse relations in one annotate() would cause.
+    """
+    totals = (
+        model.objects.filter(monthly_entry=OuterRef("pk"))
+        .order_by()
+        .values("monthly_entry")
+        .annotate(total=Sum(field))
+        .values("total")
+    )
+    return Coalesce(
+        Subquery(totals),
+        Value(Decimal("0")),
+        output_field=MoneySumField(max_digits=12, decimal_places=2),
+    )
+
+
+class MonthlyEntryQuerySet(models.QuerySet):
+    def with_balance(self):
+        """Annotate products_total, payments_total and balance = products - payments"""
+        return self.annotate(
+            products_total=entry_total(MonthlyProduct, "total_amount"),
+            payments_total=entry_total(MonthlyPayment, "amount"),
+            balance=ExpressionWrapper(
+                F("products_total") - F("payments_total"),
+                output_field=MoneySumField(max_digits=12, decimal_places=2),
+            ),
+        )
+
+
 class MonthlyEntry(models.Model):
     employee = models.ForeignKey(
         Employee, on_delete=models.CASCADE, related_name="monthly_entries"
     )
     month = models.DateField()  # First day of the month
-    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -77,9 +192,26 @@ class MonthlyEntry(models.Model):
         ordering = ["-month", "employee"]
         unique_together = ("employee", "month")
 
+    objects = MonthlyEntryQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.employee} - {self.month.strftime('%B %Y')}"
 
+    @property
+    def balance(self):
+        """Products minus payments; set by with_balance(), otherwise queried on first access"""
+        if "_balance" not in self.__dict__:
+            self._balance = (
+                MonthlyEntry.objects.with_balance()
+                .values_list("balance", flat=True)
+                .get(pk=self.pk)
+            )
+        return self._balance
+
+    @balance.setter
+    def balance(self, value):
+        self._balance = value
+
 
 class MonthlyProduct(models.Model):
     monthly_entry = models.ForeignKey(
@@ -157,6 +289,31 @@ class WarehouseMovement(models.Model):
     class Meta:
         db_table = "warehouse_movements"
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "item", "type"], name="wh_move_created_idx"),
+            models.Index(fields=["item", "-date"], name="wm_item_date_desc_idx"),
+        ]
 
     def __str__(self):
         return f"{self.item.name} - {self.type}: {self.quantity}"
+
+    def apply(self):
+        """Adjust the item's stock by this movement; call inside transaction.atomic()"""
+        self._shift_stock(adding=self.type == self.IN)
+
+    def revert(self):
+        """Undo apply() before the movement is deleted"""
+        self._shift_stock(adding=self.type != self.IN)
+
+    def _shift_stock(self, adding):
+        if adding:
+            quantity = F("quantity") + self.quantity
+            quantity_kg = F("quantity_kg") + self.quantity_kg
+        else:
+            quantity = Greatest(F("quantity") - self.quantity, 0)
+            quantity_kg = Greatest(F("quantity_kg") - self.quantity_kg, Decimal("0"))
+
+        # Let the database compute the new stock instead of read-modify-write
+        WarehouseItem.objects.filter(pk=self.item_id).update(
+            quantity=quantity, quantity_kg=quantity_kg
+        )
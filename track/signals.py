@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from track.cache import invalidate_payment_methods, invalidate_transactions, invalidate_warehouse_items
+from track.models import DailyBalance, PaymentMethod, Transaction, WarehouseItem, WarehouseMovement
+
+
+@receiver([post_save, post_delete], sender=PaymentMethod)
+def payment_method_changed(sender, **kwargs):
+    invalidate_payment_methods()
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def transaction_changed(sender, **kwargs):
+    invalidate_transactions()
+
+
+@receiver([pre_save, pre_delete], sender=Transaction)
+def remember_transaction(sender, instance, **kwargs):
+    # The stored row (not a possibly stale instance) is what leaves its DailyBalance day
+    instance._previous = None
+    if instance.pk:
+        instance._previous = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values_list('date', 'currency', 'type', 'amount')
+            .first()
+        )
+
+
+def previous_daily_balance_rows(instance):
+    if not getattr(instance, '_previous', None):
+        return []
+    date, currency, type, amount = instance._previous
+    return [(date, currency, type, -amount)]
+
+
+@receiver(post_save, sender=Transaction)
+def update_daily_balance_on_save(sender, instance, **kwargs):
+    DailyBalance.apply_deltas(
+        previous_daily_balance_rows(instance)
+        + [(instance.date, instance.currency, instance.type, instance.amount)]
+    )
+
+
+@receiver(post_delete, sender=Transaction)
+def update_daily_balance_on_delete(sender, instance, **kwargs):
+    DailyBalance.apply_deltas(previous_daily_balance_rows(instance))
+
+
+@receiver([post_save, post_delete], sender=WarehouseItem)
+@receiver([post_save, post_delete], sender=WarehouseMovement)
+def warehouse_changed(sender, **kwargs):
+    invalidate_warehouse_items()
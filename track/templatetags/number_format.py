@@ -2,10 +2,12 @@ from django import template
 
 register = template.Library()
 
+_DOT_THOUSANDS = str.maketrans(",", ".")
+
 
 @register.filter
 def dot_thousands(value):
     try:
-        return f"{int(value):,}".replace(",", ".")
+        return format(int(value), ",d").translate(_DOT_THOUSANDS)
     except (ValueError, TypeError):
         return value
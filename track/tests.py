@@ -1,3 +1,140 @@
+from datetime import date
+from unittest import mock
+
+import orjson
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db.models import QuerySet
 from django.test import TestCase
 
-# Create your tests here.
+from track.models import DailyBalance, PaymentMethod, Transaction
+from track.views import filter_transactions, get_currency_totals, get_snapshot_totals
+
+
+class DailyBalanceTests(TestCase):
+    """DailyBalance must match a full SUM over transactions after every write path"""
+
+    FILTERS = [
+        {},
+        {'currency': 'usd'},
+        {'currency': 'uzs'},
+        {'type': 'income'},
+        {'type': 'expense', 'date_from': '2026-01-06'},
+        {'date_from': '2026-01-05', 'date_to': '2026-01-05'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.method = PaymentMethod.objects.create(name='Cash')
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def post(self, url, data):
+        return self.client.post(url, orjson.dumps(data), content_type='application/json')
+
+    def assertSnapshotMatches(self):
+        for params in self.FILTERS:
+            with self.subTest(params=params):
+                self.assertEqual(
+                    get_snapshot_totals(params),
+                    get_currency_totals(filter_transactions(Transaction.objects.all(), params)),
+                )
+
+    def create(self, **fields):
+        data = {'type': 'income', 'amount': 100, 'date': '2026-01-05', 'method': self.method.id, 'currency': 'usd'}
+        data.update(fields)
+        response = self.post('/api/transaction/create/', data)
+        self.assertEqual(response.status_code, 200)
+        return orjson.loads(response.content)['id']
+
+    def test_create(self):
+        self.create()
+        self.create(amount=40)
+        self.create(type='expense', amount=25, date='2026-01-06', currency='uzs')
+        self.assertSnapshotMatches()
+        self.assertEqual(
+            DailyBalance.objects.get(date=date(2026, 1, 5), currency='usd').income_total, 140
+        )
+
+    def test_bulk_create(self):
+        self.create()
+        rows = [
+            {'type': 'income', 'amount': 10, 'date': '2026-01-05', 'method': self.method.id, 'currency': 'usd'},
+            {'type': 'expense', 'amount': 3, 'date': '2026-01-05', 'method': self.method.id, 'currency': 'usd'},
+            {'type': 'income', 'amount': 7, 'date': '2026-01-07', 'method': self.method.id, 'currency': 'afn'},
+        ]
+        response = self.post('/api/transactions/bulk/', rows)
+        self.assertEqual(response.status_code, 200)
+        self.assertSnapshotMatches()
+
+    def test_update_moves_amount_between_days(self):
+        transaction_id = self.create()
+        self.create(amount=5)
+        response = self.post(
+            f'/api/transaction/{transaction_id}/update/',
+            {'type': 'expense', 'currency': 'uzs', 'date': '2026-01-06', 'amount': 60},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertSnapshotMatches()
+        self.assertEqual(
+            DailyBalance.objects.get(date=date(2026, 1, 5), currency='usd').income_total, 5
+        )
+
+    def test_model_save_moves_amount_between_days(self):
+        # The admin path: save() on an instance, handled by the pre_save/post_save signals
+        transaction = Transaction.objects.create(
+            type='income', amount=50, date='2026-01-05', method=self.method, currency='usd'
+        )
+        transaction.type = 'expense'
+        transaction.currency = 'afn'
+        transaction.date = '2026-01-08'
+        transaction.amount = 7
+        transaction.save()
+        self.assertSnapshotMatches()
+
+    def test_delete(self):
+        transaction_id = self.create()
+        self.create(amount=30)
+        response = self.post(f'/api/transaction/{transaction_id}/delete/', {})
+        self.assertEqual(response.status_code, 200)
+        self.assertSnapshotMatches()
+
+    def test_delete_stale_instance_uses_stored_row(self):
+        transaction = Transaction.objects.create(
+            type='income', amount=50, date='2026-01-05', method=self.method, currency='usd'
+        )
+        Transaction.objects.filter(pk=transaction.pk).update(currency='uzs')
+        DailyBalance.apply_deltas([
+            (date(2026, 1, 5), 'usd', 'income', -50),
+            (date(2026, 1, 5), 'uzs', 'income', 50),
+        ])
+        transaction.delete()
+        self.assertSnapshotMatches()
+
+    def test_add_retries_after_losing_insert_race(self):
+        day = date(2026, 1, 9)
+        # Another writer creates the day after our UPDATE found no row
+        DailyBalance.objects.create(date=day, currency='usd', income_total=10)
+        update = QuerySet.update
+        calls = []
+
+        def update_before_concurrent_insert(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_before_concurrent_insert):
+            DailyBalance.apply_deltas([(day, 'usd', Transaction.TYPE_INCOME, 5)])
+
+        # UPDATE, INSERT hit the UNIQUE constraint, UPDATE again
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(DailyBalance.objects.get(date=day, currency='usd').income_total, 15)
+
+    def test_add_reraises_when_retry_finds_no_row(self):
+        with mock.patch.object(DailyBalance.objects, 'create', side_effect=IntegrityError('CHECK')):
+            with self.assertRaises(IntegrityError):
+                DailyBalance.apply_deltas([(date(2026, 1, 9), 'usd', Transaction.TYPE_INCOME, 5)])
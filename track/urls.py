@@ -5,9 +5,15 @@ from .views import (
     UsersView,
     MonthlyView,
     WarehouseView,
+    CreateWarehouseItemFormView,
+    WarehouseMovementFormView,
+    DeleteWarehouseMovementFormView,
+    DeleteWarehouseItemFormView,
     TransactionListAPIView,
+    TransactionExportView,
     StatsAPIView,
     CreateTransactionAPIView,
+    BulkCreateTransactionAPIView,
     TransactionDetailAPIView,
     DeleteTransactionAPIView,
     UsersListAPIView,
@@ -38,11 +44,17 @@ urlpatterns = [
     path('users/', UsersView.as_view(), name='users'),
     path('monthly/', MonthlyView.as_view(), name='monthly'),
     path('warehouse/', WarehouseView.as_view(), name='warehouse'),
+    path('warehouse/item/create/', CreateWarehouseItemFormView.as_view(), name='warehouse_create_item'),
+    path('warehouse/item/<int:item_id>/delete/', DeleteWarehouseItemFormView.as_view(), name='warehouse_delete_item'),
+    path('warehouse/entry/add/', WarehouseMovementFormView.as_view(), name='warehouse_add_movement'),
+    path('warehouse/entry/<int:movement_id>/delete/', DeleteWarehouseMovementFormView.as_view(), name='warehouse_delete_movement'),
     
     # Transaction API endpoints
     path('api/transactions/', TransactionListAPIView.as_view(), name='api_transactions'),
+    path('api/transactions/export/', TransactionExportView.as_view(), name='api_export_transactions'),
     path('api/stats/', StatsAPIView.as_view(), name='api_stats'),
     path('api/transaction/create/', CreateTransactionAPIView.as_view(), name='api_create_transaction'),
+    path('api/transactions/bulk/', BulkCreateTransactionAPIView.as_view(), name='api_bulk_create_transactions'),
     path('api/transaction/<int:transaction_id>/', TransactionDetailAPIView.as_view(), name='api_transaction_detail'),
     path('api/transaction/<int:transaction_id>/update/', TransactionDetailAPIView.as_view(), name='api_update_transaction'),
     path('api/transaction/<int:transaction_id>/delete/', DeleteTransactionAPIView.as_view(), name='api_delete_transaction'),
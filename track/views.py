@@ -1,45 +1,246 @@
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
-from django.db.models import Sum, Q
-from django.db.models.functions import Coalesce
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction as db_transaction
+from django.db.models import F, Sum, Q, Value
+from django.db.models.functions import Coalesce, Concat
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.views.decorators.http import require_http_methods
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-import json
-from datetime import datetime
-from decimal import Decimal
-
-from track.models import Transaction, PaymentMethod, Employee, MonthlyEntry, MonthlyProduct, MonthlyPayment, WarehouseItem, WarehouseMovement
+import csv
+from collections import defaultdict
+from itertools import batched
+from datetime import date as datetime_date, datetime
+from decimal import Decimal, InvalidOperation
+
+import orjson
+
+from track.cache import (
+    cache_warehouse_items,
+    cached_warehouse_items,
+    dashboard_totals,
+    invalidate_transactions,
+    invalidate_warehouse_items,
+    payment_methods as cached_payment_methods,
+    transaction_stats,
+    warehouse_items_version,
+)
+from track.functions import DotThousands
+from track.http import JsonAuthMixin, json_err, json_ok, json_request_required, staff_required_json
+from track.models import Transaction, DailyBalance, Employee, MonthlyEntry, MonthlyProduct, MonthlyPayment, WarehouseItem, WarehouseMovement
+
+# Stats are reported in this order; the frozenset is for membership checks
+CURRENCIES = tuple(code for code, _ in Transaction.CURRENCY_CHOICES)
+VALID_CURRENCIES = frozenset(CURRENCIES)
+VALID_TYPES = frozenset(code for code, _ in Transaction.TYPE_CHOICES)
+# Unknown or missing currencies fall back to UZS via NORMALIZE_CURRENCY.get(value, 'uzs')
+NORMALIZE_CURRENCY = {code: code for code in CURRENCIES}
+
+
+def transaction_filter(params):
+    """Q for the type/method/date/currency filters shared by the list, stats and export endpoints"""
+    q = Q()
+
+    # Filter by type
+    transaction_type = params.get('type')
+    if transaction_type:
+        q &= Q(type=transaction_type)
+
+    # Filter by method
+    method_id = params.get('method')
+    if method_id:
+        q &= Q(method_id=method_id)
+
+    # Filter by date range
+    date_from = params.get('date_from')
+    if date_from:
+        q &= Q(date__gte=date_from)
+
+    date_to = params.get('date_to')
+    if date_to:
+        q &= Q(date__lte=date_to)
+
+    # Filter by currency
+    currency = params.get('currency')
+    if currency in VALID_CURRENCIES:
+        q &= Q(currency=currency)
+
+    return q
+
+
+def filter_transactions(transactions, params):
+    """Apply transaction_filter() with a single filter() call"""
+    return transactions.filter(transaction_filter(params))
+
+
+def get_currency_totals(transactions):
+    """Income, expense and balance per currency from a single GROUP BY query"""
+    rows = (
+        transactions.order_by()
+        .values('currency', 'type')
+        .annotate(total=Coalesce(Sum('amount'), 0))
+    )
+    totals = {(row['currency'], row['type']): row['total'] for row in rows}
+
+    result = {}
+    for curr in CURRENCIES:
+        inc = totals.get((curr, Transaction.TYPE_INCOME), 0)
+        exp = totals.get((curr, Transaction.TYPE_EXPENSE), 0)
+        result[f'incomes_{curr}'] = inc
+        result[f'expenses_{curr}'] = exp
+        result[f'balance_{curr}'] = inc - exp
+    return result
+
+
+def get_snapshot_totals(params):
+    """get_currency_totals() for the same filters, read from per-day DailyBalance rows"""
+    balances = DailyBalance.objects.all()
+
+    date_from = params.get('date_from')
+    if date_from:
+        balances = balances.filter(date__gte=date_from)
+
+    date_to = params.get('date_to')
+    if date_to:
+        balances = balances.filter(date__lte=date_to)
+
+    currency = params.get('currency')
+    if currency in VALID_CURRENCIES:
+        balances = balances.filter(currency=currency)
+
+    sums = {}
+    for curr in CURRENCIES:
+        sums[f'incomes_{curr}'] = Coalesce(Sum('income_total', filter=Q(currency=curr)), 0)
+        sums[f'expenses_{curr}'] = Coalesce(Sum('expense_total', filter=Q(currency=curr)), 0)
+    totals = balances.aggregate(**sums)
+
+    transaction_type = params.get('type')
+    result = {}
+    for curr in CURRENCIES:
+        inc = totals[f'incomes_{curr}'] if transaction_type in (None, '', Transaction.TYPE_INCOME) else 0
+        exp = totals[f'expenses_{curr}'] if transaction_type in (None, '', Transaction.TYPE_EXPENSE) else 0
+        result[f'incomes_{curr}'] = inc
+        result[f'expenses_{curr}'] = exp
+        result[f'balance_{curr}'] = inc - exp
+    return result
+
+
+def get_stats(params, transactions):
+    """Stats for the filtered transactions; DailyBalance covers every filter except method"""
+    if params.get('method'):
+        return get_currency_totals(transactions)
+    return get_snapshot_totals(params)
+
+
+def entry_balance(entry_id):
+    """(employee_id, balance) of a MonthlyEntry, balance computed from its products and payments"""
+    return MonthlyEntry.objects.with_balance().values_list('employee_id', 'balance').get(id=entry_id)
+
+
+def to_decimal(value):
+    """Decimal from a JSON or form value; missing/blank is 0"""
+    if value is None or value == '':
+        return Decimal(0)
+    # orjson yields floats for 1.5; str() keeps their printed digits instead of the binary expansion
+    if isinstance(value, float):
+        value = str(value)
+    return Decimal(value)
+
+
+def load_json_object(body):
+    """orjson.loads() for endpoints that take a {...} body"""
+    data = orjson.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    return data
+
+
+def to_text(data, key):
+    """Stripped string for key; missing or null is ''"""
+    value = data.get(key) or ''
+    if not isinstance(value, str):
+        raise ValueError(f'{key} must be a string')
+    return value.strip()
+
+
+def paginate(queryset, request, default_page_size=50, max_page_size=200):
+    """Slice queryset by ?page=&page_size= params; returns (rows, pagination) or (queryset, None)"""
+    if 'page' not in request.GET and 'page_size' not in request.GET:
+        return queryset, None
+
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        page_size = int(request.GET.get('page_size', default_page_size))
+    except ValueError:
+        page_size = default_page_size
+    page_size = min(max(page_size, 1), max_page_size)
+
+    # Fetch one extra row to know whether a next page exists without COUNT(*)
+    offset = (page - 1) * page_size
+    rows = list(queryset[offset:offset + page_size + 1])
+    pagination = {
+        'page': page,
+        'page_size': page_size,
+        'has_next': len(rows) > page_size,
+    }
+    return rows[:page_size], pagination
+
+
+def json_list_chunks(key, rows, extra=None):
+    """Encode {"<key>": [...]} row by row, yielding bytes"""
+    yield b'{'
+    for name, value in (extra or {}).items():
+        yield orjson.dumps(name) + b':' + orjson.dumps(value, default=str) + b','
+    yield orjson.dumps(key) + b':['
+    separator = b''
+    for row in rows:
+        yield separator + orjson.dumps(row, default=str)
+        separator = b','
+    yield b']}'
+
+
+def stream_json_list(key, rows, extra=None):
+    """Stream {"<key>": [...]} row by row instead of building the whole list in memory"""
+    return StreamingHttpResponse(json_list_chunks(key, rows, extra), content_type='application/json')
+
+
+class Echo:
+    """File-like object for csv.writer that hands each row back instead of buffering it"""
+
+    def write(self, value):
+        return value
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'dashboard.html'
 
+    def get_date_from(self):
+        """Start of the current month; also pre-fills the From Date filter that the page's JS fetches with"""
+        return timezone.localdate().replace(day=1)
+
     def get_transactions(self):
-        return Transaction.objects.all()
+        return Transaction.objects.select_related('method').only(
+            'id', 'type', 'currency', 'amount', 'description', 'date', 'method_id', 'method__name'
+        ).filter(date__gte=self.get_date_from()).annotate(amount_fmt=DotThousands('amount'))
 
     def set_balance(self, transactions, kwargs):
         """Stats per currency: UZS, USD, AFN"""
-        for curr in ['uzs', 'usd', 'afn']:
-            qs = transactions.filter(currency=curr)
-            inc = qs.filter(type=Transaction.TYPE_INCOME).aggregate(
-                total=Coalesce(Sum('amount'), 0)
-            )['total']
-            exp = qs.filter(type=Transaction.TYPE_EXPENSE).aggregate(
-                total=Coalesce(Sum('amount'), 0)
-            )['total']
-            kwargs[f'incomes_{curr}'] = inc
-            kwargs[f'expenses_{curr}'] = exp
-            kwargs[f'balance_{curr}'] = inc - exp
+        kwargs.update(dashboard_totals(self.get_date_from(), lambda: get_currency_totals(transactions)))
 
     def get_context_data(self, **kwargs):
         transactions = self.get_transactions()
-        payment_methods = PaymentMethod.objects.all()
+        payment_methods = cached_payment_methods()
         kwargs['transactions'] = transactions
         kwargs['payment_methods'] = payment_methods
+        kwargs['date_from'] = self.get_date_from()
 
         self.set_balance(transactions, kwargs)
         return super().get_context_data(**kwargs)
@@ -49,271 +250,242 @@ class UsersView(LoginRequiredMixin, TemplateView):
     template_name = 'users.html'
 
     def get_context_data(self, **kwargs):
-        users = User.objects.all()
+        users = User.objects.only(
+            'id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff'
+        ).order_by('id')
         kwargs['users'] = users
         return super().get_context_data(**kwargs)
 
 
-class TransactionListAPIView(LoginRequiredMixin, View):
+class TransactionListAPIView(JsonAuthMixin, View):
     """API endpoint to list transactions with filters"""
     
     def get(self, request):
-        transactions = Transaction.objects.all()
-        
-        # Filter by type
-        transaction_type = request.GET.get('type')
-        if transaction_type:
-            transactions = transactions.filter(type=transaction_type)
-        
-        # Filter by method
-        method_id = request.GET.get('method')
-        if method_id:
-            transactions = transactions.filter(method_id=method_id)
-        
-        # Filter by date range
-        date_from = request.GET.get('date_from')
-        if date_from:
-            transactions = transactions.filter(date__gte=date_from)
-        
-        date_to = request.GET.get('date_to')
-        if date_to:
-            transactions = transactions.filter(date__lte=date_to)
+        transactions = filter_transactions(Transaction.objects.all(), request.GET)
+        stats = transaction_stats(request.GET, lambda: get_stats(request.GET, transactions))
         
-        # Filter by currency
-        currency = request.GET.get('currency')
-        if currency and currency in ('uzs', 'usd', 'afn'):
-            transactions = transactions.filter(currency=currency)
+        # values() skips model instantiation; the method name comes from the same JOIN
+        rows = transactions.order_by('-date', '-id').values(
+            'id', 'type', 'currency', 'amount', 'description', 'date', 'method_id',
+            method_name=F('method__name'),
+            amount_fmt=DotThousands('amount'),
+        )
+        rows, pagination = paginate(rows, request)
+        if pagination is None:
+            return stream_json_list('transactions', rows.iterator(chunk_size=2000), extra={'stats': stats})
         
-        data = {
-            'transactions': [
-                {
-                    'id': t.id,
-                    'type': t.type,
-                    'currency': t.currency,
-                    'amount': t.amount,
-                    'description': t.description,
-                    'date': t.date.isoformat(),
-                    'method_id': t.method_id,
-                    'method_name': t.method.name,
-                }
-                for t in transactions
-            ]
-        }
-        
-        return JsonResponse(data)
+        return json_ok({'stats': stats, 'transactions': rows, 'pagination': pagination})
 
 
-class StatsAPIView(LoginRequiredMixin, View):
-    """API endpoint to get stats with filters"""
+class TransactionExportView(JsonAuthMixin, View):
+    """Stream filtered transactions as CSV without loading them all into memory"""
     
     def get(self, request):
-        transactions = Transaction.objects.all()
-        
-        # Filter by type
-        transaction_type = request.GET.get('type')
-        if transaction_type:
-            transactions = transactions.filter(type=transaction_type)
-        
-        # Filter by method
-        method_id = request.GET.get('method')
-        if method_id:
-            transactions = transactions.filter(method_id=method_id)
-        
-        # Filter by date range
-        date_from = request.GET.get('date_from')
-        if date_from:
-            transactions = transactions.filter(date__gte=date_from)
-        
-        date_to = request.GET.get('date_to')
-        if date_to:
-            transactions = transactions.filter(date__lte=date_to)
+        transactions = filter_transactions(Transaction.objects.all(), request.GET)
+        rows = transactions.order_by('-date', '-id').values_list(
+            'id', 'date', 'type', 'currency', 'amount', 'method__name', 'description'
+        )
         
-        # Filter by currency
-        currency = request.GET.get('currency')
-        if currency and currency in ('uzs', 'usd', 'afn'):
-            transactions = transactions.filter(currency=currency)
+        writer = csv.writer(Echo())
         
-        result = {}
-        for curr in ['uzs', 'usd', 'afn']:
-            qs = transactions.filter(currency=curr)
-            inc = qs.filter(type=Transaction.TYPE_INCOME).aggregate(
-                total=Coalesce(Sum('amount'), 0)
-            )['total']
-            exp = qs.filter(type=Transaction.TYPE_EXPENSE).aggregate(
-                total=Coalesce(Sum('amount'), 0)
-            )['total']
-            result[f'incomes_{curr}'] = inc
-            result[f'expenses_{curr}'] = exp
-            result[f'balance_{curr}'] = inc - exp
+        def generate():
+            yield writer.writerow(['id', 'date', 'type', 'currency', 'amount', 'method', 'description'])
+            for row in rows.iterator(chunk_size=2000):
+                yield writer.writerow(row)
         
-        return JsonResponse(result)
+        response = StreamingHttpResponse(generate(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
+        return response
 
 
-def check_staff_permission(user):
-    """Check if user has staff permission for write operations"""
-    if not user.is_staff:
-        return JsonResponse({
-            'success': False,
-            'error': 'Permission denied. Only staff users can perform this action.',
-        }, status=403)
-    return None
+class StatsAPIView(JsonAuthMixin, View):
+    """API endpoint to get stats with filters (also included in the transaction list response)"""
+    
+    def get(self, request):
+        transactions = filter_transactions(Transaction.objects.all(), request.GET)
+        result = transaction_stats(request.GET, lambda: get_stats(request.GET, transactions))
+        
+        return json_ok(result)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CreateTransactionAPIView(LoginRequiredMixin, View):
+class CreateTransactionAPIView(JsonAuthMixin, View):
     """API endpoint to create a transaction"""
     
+    @staff_required_json
     def post(self, request):
-        # Check staff permission
-        perm_check = check_staff_permission(request.user)
-        if perm_check:
-            return perm_check
-            
         try:
-            data = json.loads(request.body)
+            data = orjson.loads(request.body)
             
-            currency = data.get('currency', 'uzs')
-            if currency not in ('uzs', 'usd', 'afn'):
-                currency = 'uzs'
-            transaction = Transaction.objects.create(
-                type=data.get('type'),
-                amount=int(data.get('amount')),
-                description=data.get('description', ''),
-                date=data.get('date'),
-                method_id=int(data.get('method')),
-                currency=currency,
-            )
+            currency = NORMALIZE_CURRENCY.get(data.get('currency'), 'uzs')
+            # post_save adds it to DailyBalance; both commit or neither does
+            with db_transaction.atomic():
+                transaction = Transaction.objects.create(
+                    type=data.get('type'),
+                    amount=int(data.get('amount')),
+                    description=data.get('description', ''),
+                    date=data.get('date'),
+                    method_id=int(data.get('method')),
+                    currency=currency,
+                )
             
-            return JsonResponse({
+            return json_ok({
                 'success': True,
                 'id': transaction.id,
             })
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BulkCreateTransactionAPIView(JsonAuthMixin, View):
+    """API endpoint to create many transactions from a JSON array"""
+    
+    @staff_required_json
+    def post(self, request):
+        try:
+            rows = orjson.loads(request.body)
+            if not isinstance(rows, list):
+                return json_err('Expected a JSON array of transactions')
+            
+            objs = []
+            for index, row in enumerate(rows):
+                # Fail before any INSERT instead of on the txn_type_valid constraint
+                if row.get('type') not in VALID_TYPES:
+                    return json_err(f'Row {index}: invalid transaction type')
+                currency = NORMALIZE_CURRENCY.get(row.get('currency'), 'uzs')
+                objs.append(Transaction(
+                    type=row.get('type'),
+                    amount=int(row.get('amount')),
+                    description=row.get('description', ''),
+                    date=row.get('date'),
+                    method_id=int(row.get('method')),
+                    currency=currency,
+                ))
+            
+            # One INSERT per batch instead of one round-trip per row
+            with db_transaction.atomic():
+                Transaction.objects.bulk_create(objs, batch_size=500)
+                DailyBalance.apply_deltas(
+                    (obj.date, obj.currency, obj.type, obj.amount) for obj in objs
+                )
+            # bulk_create doesn't send post_save
+            invalidate_transactions()
+            
+            return json_ok({
+                'success': True,
+                'created': len(objs),
+            })
+        except Exception as e:
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class TransactionDetailAPIView(LoginRequiredMixin, View):
+class TransactionDetailAPIView(JsonAuthMixin, View):
     """API endpoint to get, update, or delete a transaction"""
     
     def get(self, request, transaction_id):
         try:
             transaction = Transaction.objects.get(id=transaction_id)
-            return JsonResponse({
+            return json_ok({
                 'id': transaction.id,
                 'type': transaction.type,
                 'currency': transaction.currency,
                 'amount': transaction.amount,
                 'description': transaction.description,
-                'date': transaction.date.isoformat(),
+                'date': transaction.date,
                 'method': transaction.method_id,
             })
         except Transaction.DoesNotExist:
-            return JsonResponse({
-                'error': 'Transaction not found'
-            }, status=404)
+            return json_err('Transaction not found', status=404)
     
+    @staff_required_json
     def post(self, request, transaction_id):
-        # Check staff permission
-        perm_check = check_staff_permission(request.user)
-        if perm_check:
-            return perm_check
-            
         try:
-            data = json.loads(request.body)
-            transaction = Transaction.objects.get(id=transaction_id)
+            data = orjson.loads(request.body)
             
-            transaction.type = data.get('type', transaction.type)
-            transaction.amount = int(data.get('amount', transaction.amount))
-            transaction.description = data.get('description', transaction.description)
-            transaction.date = data.get('date', transaction.date)
-            transaction.method_id = int(data.get('method', transaction.method_id))
+            # Only the provided fields are written, in a single UPDATE
+            fields = {}
+            if 'type' in data:
+                fields['type'] = data['type']
+            if 'amount' in data:
+                fields['amount'] = int(data['amount'])
+            if 'description' in data:
+                fields['description'] = data['description']
+            if 'date' in data:
+                fields['date'] = data['date']
+            if 'method' in data:
+                fields['method_id'] = int(data['method'])
             curr = data.get('currency')
-            if curr in ('uzs', 'usd', 'afn'):
-                transaction.currency = curr
-            transaction.save()
+            if curr in VALID_CURRENCIES:
+                fields['currency'] = curr
             
-            return JsonResponse({
+            transactions = Transaction.objects.filter(id=transaction_id)
+            if fields:
+                columns = ('date', 'currency', 'type', 'amount')
+                with db_transaction.atomic():
+                    # Locked so a concurrent edit can't subtract the same old amount twice
+                    old = list(transactions.select_for_update().values_list(*columns))
+                    updated = transactions.update(**fields)
+                    DailyBalance.apply_deltas(
+                        [(date, currency, type, -amount) for date, currency, type, amount in old]
+                        + list(transactions.values_list(*columns))
+                    )
+                # update() doesn't send post_save
+                invalidate_transactions()
+            else:
+                updated = transactions.exists()
+            if not updated:
+                return json_err('Transaction not found', status=404)
+            
+            return json_ok({
                 'success': True,
-                'id': transaction.id,
+                'id': transaction_id,
             })
-        except Transaction.DoesNotExist:
-            return JsonResponse({
-                'error': 'Transaction not found'
-            }, status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DeleteTransactionAPIView(LoginRequiredMixin, View):
+class DeleteTransactionAPIView(JsonAuthMixin, View):
     """API endpoint to delete a transaction"""
     
+    @staff_required_json
     def post(self, request, transaction_id):
-        # Check staff permission
-        perm_check = check_staff_permission(request.user)
-        if perm_check:
-            return perm_check
-            
         try:
-            transaction = Transaction.objects.get(id=transaction_id)
-            transaction.delete()
-            return JsonResponse({
+            with db_transaction.atomic():
+                # Locked so two deletes can't both subtract it from DailyBalance (post_delete)
+                transaction = Transaction.objects.select_for_update().filter(id=transaction_id).first()
+                if transaction is None:
+                    return json_err('Transaction not found', status=404)
+                transaction.delete()
+            return json_ok({
                 'success': True,
             })
-        except Transaction.DoesNotExist:
-            return JsonResponse({
-                'error': 'Transaction not found'
-            }, status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
-class UsersListAPIView(LoginRequiredMixin, View):
+class UsersListAPIView(JsonAuthMixin, View):
     """API endpoint to list users"""
     
     def get(self, request):
-        users = User.objects.all()
-        data = {
-            'users': [
-                {
-                    'id': u.id,
-                    'username': u.username,
-                    'first_name': u.first_name,
-                    'last_name': u.last_name,
-                    'email': u.email,
-                    'is_active': u.is_active,
-                    'is_staff': u.is_staff,
-                }
-                for u in users
-            ]
-        }
-        return JsonResponse(data)
+        users = User.objects.values(
+            'id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff'
+        ).order_by('id')
+        users, pagination = paginate(users, request)
+        if pagination:
+            return json_ok({'users': users, 'pagination': pagination})
+        return stream_json_list('users', users.iterator(chunk_size=500))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CreateUserAPIView(LoginRequiredMixin, View):
+class CreateUserAPIView(JsonAuthMixin, View):
     """API endpoint to create a user"""
     
     def post(self, request):
         try:
-            data = json.loads(request.body)
-            
-            # Check if username already exists
-            if User.objects.filter(username=data.get('username')).exists():
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Username already exists',
-                }, status=400)
+            data = orjson.loads(request.body)
             
             user = User.objects.create_user(
                 username=data.get('username'),
@@ -325,25 +497,27 @@ class CreateUserAPIView(LoginRequiredMixin, View):
                 is_active=data.get('is_active', True),
             )
             
-            return JsonResponse({
+            return json_ok({
                 'success': True,
                 'id': user.id,
             })
+        except IntegrityError:
+            # The unique constraint on username replaces a separate exists() check
+            return json_err('Username already exists')
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class UserDetailAPIView(LoginRequiredMixin, View):
+class UserDetailAPIView(JsonAuthMixin, View):
     """API endpoint to get, update, or delete a user"""
     
     def get(self, request, user_id):
         try:
-            user = User.objects.get(id=user_id)
-            return JsonResponse({
+            user = User.objects.only(
+                'id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff'
+            ).get(id=user_id)
+            return json_ok({
                 'id': user.id,
                 'username': user.username,
                 'first_name': user.first_name,
@@ -353,13 +527,29 @@ class UserDetailAPIView(LoginRequiredMixin, View):
                 'is_staff': user.is_staff,
             })
         except User.DoesNotExist:
-            return JsonResponse({
-                'error': 'User not found'
-            }, status=404)
+            return json_err('User not found', status=404)
     
     def post(self, request, user_id):
         try:
-            data = json.loads(request.body)
+            data = orjson.loads(request.body)
+            
+            password = data.get('password')
+            if not password:
+                # No password hashing needed, so skip loading the user
+                fields = {
+                    name: data[name]
+                    for name in ('first_name', 'last_name', 'email', 'is_staff', 'is_active')
+                    if name in data
+                }
+                users = User.objects.filter(id=user_id)
+                updated = users.update(**fields) if fields else users.exists()
+                if not updated:
+                    return json_err('User not found', status=404)
+                return json_ok({
+                    'success': True,
+                    'id': user_id,
+                })
+            
             user = User.objects.get(id=user_id)
             
             user.first_name = data.get('first_name', user.first_name)
@@ -367,49 +557,34 @@ class UserDetailAPIView(LoginRequiredMixin, View):
             user.email = data.get('email', user.email)
             user.is_staff = data.get('is_staff', user.is_staff)
             user.is_active = data.get('is_active', user.is_active)
-            
-            # Update password if provided
-            password = data.get('password')
-            if password:
-                user.set_password(password)
+            user.set_password(password)
             
             user.save()
             
-            return JsonResponse({
+            return json_ok({
                 'success': True,
                 'id': user.id,
             })
         except User.DoesNotExist:
-            return JsonResponse({
-                'error': 'User not found'
-            }, status=404)
+            return json_err('User not found', status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DeleteUserAPIView(LoginRequiredMixin, View):
+class DeleteUserAPIView(JsonAuthMixin, View):
     """API endpoint to delete a user"""
     
     def post(self, request, user_id):
         try:
-            user = User.objects.get(id=user_id)
-            user.delete()
-            return JsonResponse({
+            deleted, _ = User.objects.filter(id=user_id).delete()
+            if not deleted:
+                return json_err('User not found', status=404)
+            return json_ok({
                 'success': True,
             })
-        except User.DoesNotExist:
-            return JsonResponse({
-                'error': 'User not found'
-            }, status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 class MonthlyView(LoginRequiredMixin, TemplateView):
@@ -418,54 +593,54 @@ class MonthlyView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         from django.utils import timezone
         
-        employees = Employee.objects.filter(is_active=True)
+        employees = list(Employee.objects.filter(is_active=True))
         kwargs['employees'] = employees
         
         # Get or create monthly entry for current month
         today = timezone.now().date()
         first_day = today.replace(day=1)
         
-        monthly_entries = {}
-        for emp in employees:
-            entry, created = MonthlyEntry.objects.get_or_create(
-                employee=emp,
-                month=first_day
-            )
-            monthly_entries[emp.id] = entry
+        entries = MonthlyEntry.objects.filter(employee__in=employees, month=first_day)
+        monthly_entries = {entry.employee_id: entry for entry in entries}
+        missing = [
+            MonthlyEntry(employee=emp, month=first_day)
+            for emp in employees
+            if emp.id not in monthly_entries
+        ]
+        if missing:
+            # unique_together (employee, month) makes concurrent page loads safe
+            MonthlyEntry.objects.bulk_create(missing, ignore_conflicts=True)
+            monthly_entries = {entry.employee_id: entry for entry in entries.all()}
         
         kwargs['monthly_entries'] = monthly_entries
         return super().get_context_data(**kwargs)
 
 
-class EmployeeListAPIView(LoginRequiredMixin, View):
+class EmployeeListAPIView(JsonAuthMixin, View):
     """API endpoint to list employees"""
     
     def get(self, request):
-        employees = Employee.objects.all()
-        data = {
-            'employees': [
-                {
-                    'id': e.id,
-                    'first_name': e.first_name,
-                    'last_name': e.last_name,
-                    'position': e.position,
-                    'is_active': e.is_active,
-                }
-                for e in employees
-            ]
-        }
-        return JsonResponse(data)
+        # id breaks name ties so OFFSET pages don't skip or repeat employees
+        employees = Employee.objects.values(
+            'id', 'first_name', 'last_name', 'position', 'is_active'
+        ).order_by('first_name', 'last_name', 'id')
+        employees, pagination = paginate(employees, request)
+        if pagination:
+            return json_ok({'employees': employees, 'pagination': pagination})
+        return stream_json_list('employees', employees.iterator(chunk_size=500))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CreateEmployeeAPIView(LoginRequiredMixin, View):
+class CreateEmployeeAPIView(JsonAuthMixin, View):
     """API endpoint to create an employee"""
     
     def post(self, request):
+        is_json = 'application/json' in request.META.get('CONTENT_TYPE', '')
+
         try:
             # Check if it's form data or JSON
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                data = json.loads(request.body)
+            if is_json:
+                data = orjson.loads(request.body)
             else:
                 # Form data
                 data = request.POST.dict()
@@ -479,130 +654,101 @@ class CreateEmployeeAPIView(LoginRequiredMixin, View):
                 is_active=data.get('is_active', True),
             )
             
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
+            if is_json:
+                return json_ok({
                     'success': True,
                     'id': employee.id,
                 })
             return redirect('monthly')
         except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
+            if is_json:
+                return json_err(str(e))
             return redirect('monthly')
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class EmployeeDetailAPIView(LoginRequiredMixin, View):
+class EmployeeDetailAPIView(JsonAuthMixin, View):
     """API endpoint to get, update, or delete an employee"""
     
     def get(self, request, employee_id):
         try:
-            employee = Employee.objects.get(id=employee_id)
-            return JsonResponse({
-                'id': employee.id,
-                'first_name': employee.first_name,
-                'last_name': employee.last_name,
-                'position': employee.position,
-                'phone': employee.phone,
-                'email': employee.email,
-                'is_active': employee.is_active,
-            })
+            employee = Employee.objects.values(
+                'id', 'first_name', 'last_name', 'position', 'phone', 'email', 'is_active'
+            ).get(id=employee_id)
+            return json_ok(employee)
         except Employee.DoesNotExist:
-            return JsonResponse({
-                'error': 'Employee not found'
-            }, status=404)
+            return json_err('Employee not found', status=404)
     
     def post(self, request, employee_id):
         try:
-            data = json.loads(request.body)
-            employee = Employee.objects.get(id=employee_id)
+            data = orjson.loads(request.body)
             
-            employee.first_name = data.get('first_name', employee.first_name)
-            employee.last_name = data.get('last_name', employee.last_name)
-            employee.position = data.get('position', employee.position)
-            employee.phone = data.get('phone', employee.phone)
-            employee.email = data.get('email', employee.email)
-            employee.is_active = data.get('is_active', employee.is_active)
-            employee.save()
+            # Only the provided fields are written, in a single UPDATE
+            fields = {
+                name: data[name]
+                for name in ('first_name', 'last_name', 'position', 'phone', 'email', 'is_active')
+                if name in data
+            }
+            employees = Employee.objects.filter(id=employee_id)
+            updated = employees.update(**fields) if fields else employees.exists()
+            if not updated:
+                return json_err('Employee not found', status=404)
             
-            return JsonResponse({
+            return json_ok({
                 'success': True,
-                'id': employee.id,
+                'id': employee_id,
             })
-        except Employee.DoesNotExist:
-            return JsonResponse({
-                'error': 'Employee not found'
-            }, status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
-class DeleteEmployeeAPIView(LoginRequiredMixin, View):
+class DeleteEmployeeAPIView(JsonAuthMixin, View):
     """API endpoint to delete an employee"""
     
+    @staff_required_json
     def post(self, request, employee_id):
-        if not request.user.is_staff:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
-        
+        is_json = 'application/json' in request.META.get('CONTENT_TYPE', '')
+
         try:
-            employee = Employee.objects.get(id=employee_id)
-            employee.delete()
+            deleted, _ = Employee.objects.filter(id=employee_id).delete()
+            if not deleted:
+                return json_err('Employee not found', status=404)
             
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
+            if is_json:
+                return json_ok({
                     'success': True,
                     'message': 'Employee deleted successfully',
                 })
             return redirect('monthly')
-        except Employee.DoesNotExist:
-            return JsonResponse({'error': 'Employee not found'}, status=404)
         except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
+            if is_json:
+                return json_err(str(e))
             return redirect('monthly')
 
 
-class MonthlyEntryListAPIView(LoginRequiredMixin, View):
+class MonthlyEntryListAPIView(JsonAuthMixin, View):
     """API endpoint to list monthly entries"""
     
     def get(self, request):
         employee_id = request.GET.get('employee_id')
         
-        entries = MonthlyEntry.objects.all()
+        entries = MonthlyEntry.objects.with_balance().values(
+            'id', 'employee_id', 'month', 'balance',
+            employee_name=Concat('employee__first_name', Value(' '), 'employee__last_name'),
+        )
         if employee_id:
             entries = entries.filter(employee_id=employee_id)
-        
-        data = {
-            'entries': [
-                {
-                    'id': e.id,
-                    'employee_id': e.employee_id,
-                    'employee_name': str(e.employee),
-                    'month': e.month.isoformat(),
-                    'balance': str(e.balance),
-                }
-                for e in entries
-            ]
-        }
-        return JsonResponse(data)
+
+        return json_ok({'entries': list(entries)})
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CreateMonthlyEntryAPIView(LoginRequiredMixin, View):
+class CreateMonthlyEntryAPIView(JsonAuthMixin, View):
     """API endpoint to create a monthly entry"""
     
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = orjson.loads(request.body)
             
             employee_id = int(data.get('employee_id'))
             month = data.get('month')
@@ -614,86 +760,77 @@ class CreateMonthlyEntryAPIView(LoginRequiredMixin, View):
             ).first()
             
             if existing_entry:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Monthly entry already exists for this employee and month',
-                }, status=400)
+                return json_err('Monthly entry already exists for this employee and month')
             
             entry = MonthlyEntry.objects.create(
                 employee_id=employee_id,
                 month=month,
-                balance=Decimal('0')
             )
             
-            return JsonResponse({
+            return json_ok({
                 'success': True,
                 'id': entry.id,
             })
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class MonthlyEntryDetailAPIView(LoginRequiredMixin, View):
+class MonthlyEntryDetailAPIView(JsonAuthMixin, View):
     """API endpoint to get monthly entry details with products and payments"""
     
     def get(self, request, entry_id):
         try:
-            entry = MonthlyEntry.objects.get(id=entry_id)
-            
+            entry = MonthlyEntry.objects.select_related('employee').prefetch_related(
+                'products', 'payments'
+            ).with_balance().get(id=entry_id)
+
             products = entry.products.all()
             payments = entry.payments.all()
-            
-            # Calculate totals
-            products_total = sum(p.total_amount for p in products)
-            payments_total = sum(p.amount for p in payments)
-            
-            return JsonResponse({
+
+            return json_ok({
                 'id': entry.id,
                 'employee_id': entry.employee_id,
                 'employee_name': str(entry.employee),
-                'month': entry.month.isoformat(),
-                'balance': str(entry.balance),
+                'month': entry.month,
+                'balance': entry.balance,
                 'products': [
                     {
                         'id': p.id,
                         'product_name': p.product_name,
                         'quantity': p.quantity,
-                        'price_per_unit': str(p.price_per_unit),
-                        'total_amount': str(p.total_amount),
+                        'price_per_unit': p.price_per_unit,
+                        'total_amount': p.total_amount,
                     }
                     for p in products
                 ],
                 'payments': [
                     {
                         'id': p.id,
-                        'amount': str(p.amount),
+                        'amount': p.amount,
                         'description': p.description,
-                        'payment_date': p.payment_date.isoformat(),
+                        'payment_date': p.payment_date,
                     }
                     for p in payments
                 ],
-                'products_total': str(products_total),
-                'payments_total': str(payments_total),
+                'products_total': entry.products_total,
+                'payments_total': entry.payments_total,
             })
         except MonthlyEntry.DoesNotExist:
-            return JsonResponse({
-                'error': 'Monthly entry not found'
-            }, status=404)
+            return json_err('Monthly entry not found', status=404)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class AddProductAPIView(LoginRequiredMixin, View):
+class AddProductAPIView(JsonAuthMixin, View):
     """API endpoint to add a product to monthly entry"""
     
     def post(self, request):
+        is_json = 'application/json' in request.META.get('CONTENT_TYPE', '')
+
         try:
             # Check if it's form data or JSON
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                data = json.loads(request.body)
+            if is_json:
+                data = orjson.loads(request.body)
             else:
                 # Form data
                 data = request.POST.dict()
@@ -703,134 +840,102 @@ class AddProductAPIView(LoginRequiredMixin, View):
             quantity = int(data.get('quantity'))
             price_per_unit = Decimal(data.get('price_per_unit'))
             
-            entry = MonthlyEntry.objects.get(id=entry_id)
-            
             total_amount = quantity * price_per_unit
-            
-            product = MonthlyProduct.objects.create(
-                monthly_entry=entry,
-                product_name=product_name,
-                quantity=quantity,
-                price_per_unit=price_per_unit,
-                total_amount=total_amount
-            )
-            
-            # Update balance
-            entry.balance += total_amount
-            entry.save()
-            
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
+
+            with db_transaction.atomic():
+                product = MonthlyProduct.objects.create(
+                    monthly_entry_id=entry_id,
+                    product_name=product_name,
+                    quantity=quantity,
+                    price_per_unit=price_per_unit,
+                    total_amount=total_amount
+                )
+                # Raises DoesNotExist (and rolls back) for an unknown entry
+                employee_id, new_balance = entry_balance(entry_id)
+
+            if is_json:
+                return json_ok({
                     'success': True,
                     'id': product.id,
-                    'new_balance': str(entry.balance),
+                    'new_balance': str(new_balance),
                 })
-            return redirect(f'/monthly/?emp_id={entry.employee_id}')
+            return redirect(f'/monthly/?emp_id={employee_id}')
         except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
+            if is_json:
+                return json_err(str(e))
             return redirect('monthly')
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DeleteProductAPIView(LoginRequiredMixin, View):
+class DeleteProductAPIView(JsonAuthMixin, View):
     """API endpoint to delete a product"""
     
     def post(self, request, product_id):
         try:
-            product = MonthlyProduct.objects.get(id=product_id)
-            entry = product.monthly_entry
-            
-            # Subtract from balance
-            entry.balance -= product.total_amount
-            entry.save()
-            
-            product.delete()
-            
-            return JsonResponse({
+            entry_id = MonthlyProduct.objects.values_list('monthly_entry_id', flat=True).get(id=product_id)
+            MonthlyProduct.objects.filter(id=product_id).delete()
+            _, new_balance = entry_balance(entry_id)
+
+            return json_ok({
                 'success': True,
-                'new_balance': str(entry.balance),
+                'new_balance': str(new_balance),
             })
         except MonthlyProduct.DoesNotExist:
-            return JsonResponse({
-                'error': 'Product not found'
-            }, status=404)
+            return json_err('Product not found', status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class AddPaymentAPIView(LoginRequiredMixin, View):
+class AddPaymentAPIView(JsonAuthMixin, View):
     """API endpoint to add a payment (deduct from balance)"""
     
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = orjson.loads(request.body)
             
             entry_id = int(data.get('entry_id'))
             amount = Decimal(data.get('amount'))
             description = data.get('description', '')
             payment_date = data.get('payment_date')
             
-            entry = MonthlyEntry.objects.get(id=entry_id)
-            
-            payment = MonthlyPayment.objects.create(
-                monthly_entry=entry,
-                amount=amount,
-                description=description,
-                payment_date=payment_date
-            )
-            
-            # Deduct from balance
-            entry.balance -= amount
-            entry.save()
-            
-            return JsonResponse({
+            with db_transaction.atomic():
+                payment = MonthlyPayment.objects.create(
+                    monthly_entry_id=entry_id,
+                    amount=amount,
+                    description=description,
+                    payment_date=payment_date
+                )
+                # Raises DoesNotExist (and rolls back) for an unknown entry
+                _, new_balance = entry_balance(entry_id)
+
+            return json_ok({
                 'success': True,
                 'id': payment.id,
-                'new_balance': str(entry.balance),
+                'new_balance': str(new_balance),
             })
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DeletePaymentAPIView(LoginRequiredMixin, View):
+class DeletePaymentAPIView(JsonAuthMixin, View):
     """API endpoint to delete a payment"""
     
     def post(self, request, payment_id):
         try:
-            payment = MonthlyPayment.objects.get(id=payment_id)
-            entry = payment.monthly_entry
-            
-            # Add back to balance
-            entry.balance += payment.amount
-            entry.save()
-            
-            payment.delete()
-            
-            return JsonResponse({
+            entry_id = MonthlyPayment.objects.values_list('monthly_entry_id', flat=True).get(id=payment_id)
+            MonthlyPayment.objects.filter(id=payment_id).delete()
+            _, new_balance = entry_balance(entry_id)
+
+            return json_ok({
                 'success': True,
-                'new_balance': str(entry.balance),
+                'new_balance': str(new_balance),
             })
         except MonthlyPayment.DoesNotExist:
-            return JsonResponse({
-                'error': 'Payment not found'
-            }, status=404)
+            return json_err('Payment not found', status=404)
         except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err(str(e))
 
 
 class WarehouseView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
@@ -842,310 +947,310 @@ class WarehouseView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         items = WarehouseItem.objects.all()
-        movements = WarehouseMovement.objects.all().select_related('item').order_by('-created_at')
         
         # Apply filters
         item_id = self.request.GET.get('item_id')
         movement_type = self.request.GET.get('type')
         
-        filtered_movements = movements
-        
+        q = Q()
         if item_id:
-            filtered_movements = filtered_movements.filter(item_id=item_id)
-        
+            q &= Q(item_id=item_id)
         if movement_type:
-            filtered_movements = filtered_movements.filter(type=movement_type)
+            q &= Q(type=movement_type)
+        
+        # Latest movements only; the page has no pagination
+        filtered_movements = WarehouseMovement.objects.filter(q).select_related('item').order_by('-created_at')[:200]
         
         kwargs['items'] = items
-        kwargs['movements'] = movements
         kwargs['filtered_movements'] = filtered_movements
         return super().get_context_data(**kwargs)
 
 
+# Bad client input: unparsable numbers/dates/JSON, missing keys, values a field
+# rejects (NaN decimals), values out of the column's range or length (OverflowError
+# on SQLite, DataError on PostgreSQL), or a CHECK constraint (e.g. negative
+# quantity). Anything else is a bug and should 500.
+WAREHOUSE_INPUT_ERRORS = (
+    ValueError, KeyError, TypeError, InvalidOperation, OverflowError,
+    ValidationError, DataError, IntegrityError,
+)
+
+
+def create_warehouse_item(name, quantity, quantity_kg, description):
+    if not name:
+        raise ValueError('Name is required')
+    return WarehouseItem.objects.create(
+        name=name,
+        quantity=quantity,
+        quantity_kg=quantity_kg,
+        description=description
+    )
+
+
+def add_warehouse_movement(item_id, movement_type, quantity, quantity_kg, date, description):
+    """Record a movement and apply it to the item's stock; returns (movement, new quantity)"""
+    if not item_id or not movement_type or (quantity <= 0 and quantity_kg <= 0):
+        raise ValueError('Invalid data')
+    if movement_type not in ['in', 'out']:
+        raise ValueError('Type must be "in" or "out"')
+    
+    # Parse once here rather than leaving it to DateField's to_python fallback;
+    # parse_date also takes the unpadded 2026-1-5 that DateField accepted
+    if not isinstance(date, datetime_date):
+        date = parse_date(date)
+        if date is None:
+            raise ValueError('Date must be YYYY-MM-DD')
+    
+    with db_transaction.atomic():
+        # Lock the item row so concurrent movements are applied one at a time
+        item = WarehouseItem.objects.select_for_update().only('id').get(id=item_id)
+        
+        # Create movement record
+        movement = WarehouseMovement.objects.create(
+            item=item,
+            type=movement_type,
+            quantity=quantity,
+            quantity_kg=quantity_kg,
+            date=date,
+            description=description
+        )
+        
+        # Update item quantity and quantity_kg
+        movement.apply()
+        new_quantity = WarehouseItem.objects.values_list('quantity', flat=True).get(id=item_id)
+    # apply() uses update(), which doesn't send post_save for the item
+    invalidate_warehouse_items()
+    return movement, new_quantity
+
+
+def delete_warehouse_movement(movement_id):
+    """Delete a movement and reverse its stock change; returns the item's new quantity"""
+    with db_transaction.atomic():
+        # Lock the movement so two deletes can't both revert it
+        movement = WarehouseMovement.objects.select_for_update().only(
+            'id', 'item_id', 'type', 'quantity', 'quantity_kg'
+        ).get(id=movement_id)
+        
+        # Reverse the quantity and quantity_kg update
+        movement.revert()
+        movement.delete()
+        return WarehouseItem.objects.values_list('quantity', flat=True).get(id=movement.item_id)
+
+
+class WarehouseFormView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Base for the warehouse page's form posts; every outcome redirects back to the page"""
+    
+    def test_func(self):
+        return self.request.user.is_staff
+
+
+class CreateWarehouseItemFormView(WarehouseFormView):
+    def post(self, request):
+        try:
+            create_warehouse_item(
+                name=request.POST.get('name', '').strip(),
+                quantity=int(request.POST.get('quantity', 0)),
+                quantity_kg=to_decimal(request.POST.get('quantity_kg')),
+                description=request.POST.get('description', '').strip(),
+            )
+        except WAREHOUSE_INPUT_ERRORS:
+            pass
+        return redirect('warehouse')
+
+
+class WarehouseMovementFormView(WarehouseFormView):
+    def post(self, request):
+        try:
+            add_warehouse_movement(
+                item_id=int(request.POST.get('item_id')),
+                movement_type=request.POST.get('type'),
+                quantity=int(request.POST.get('quantity', 0)),
+                quantity_kg=to_decimal(request.POST.get('quantity_kg')),
+                date=request.POST.get('date', str(datetime.now().date())),
+                description=request.POST.get('description', '').strip(),
+            )
+        except WAREHOUSE_INPUT_ERRORS + (WarehouseItem.DoesNotExist,):
+            pass
+        return redirect('warehouse')
+
+
+class DeleteWarehouseMovementFormView(WarehouseFormView):
+    def post(self, request, movement_id):
+        try:
+            delete_warehouse_movement(movement_id)
+        except WarehouseMovement.DoesNotExist:
+            pass
+        return redirect('warehouse')
+
+
+class DeleteWarehouseItemFormView(WarehouseFormView):
+    def post(self, request, item_id):
+        WarehouseItem.objects.filter(id=item_id).delete()
+        return redirect('warehouse')
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class WarehouseItemListAPIView(LoginRequiredMixin, View):
+class WarehouseItemListAPIView(JsonAuthMixin, View):
     """Get all warehouse items with their movements"""
     
+    @staff_required_json
     def get(self, request):
-        if not request.user.is_staff:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
+        version = warehouse_items_version()
+        payload = cached_warehouse_items(version)
+        if payload is not None:
+            return HttpResponse(payload, content_type='application/json')
         
-        items = WarehouseItem.objects.all()
-        data = {
-            'items': []
-        }
+        chunks = cache_warehouse_items(json_list_chunks('items', self.iter_items()), version)
+        return StreamingHttpResponse(chunks, content_type='application/json')
+    
+    def iter_items(self, batch_size=200):
+        """Items with their movements, read and grouped one batch of items at a time"""
+        items = WarehouseItem.objects.values(
+            'id', 'name', 'description', 'quantity', 'quantity_kg'
+        ).iterator(chunk_size=batch_size)
         
-        for item in items:
-            movements = WarehouseMovement.objects.filter(item=item).order_by('-date')
-            movements_list = []
-            for m in movements:
-                movements_list.append({
-                    'id': m.id,
-                    'type': m.type,
-                    'quantity': m.quantity,
-                    'quantity_kg': str(m.quantity_kg),
-                    'date': m.date.isoformat() if hasattr(m.date, 'isoformat') else str(m.date),
-                    'description': m.description or ''
-                })
+        for batch in batched(items, batch_size):
+            movements = WarehouseMovement.objects.filter(
+                item_id__in=[item['id'] for item in batch]
+            ).order_by('-date').values_list(
+                'item_id', 'id', 'type', 'quantity', 'quantity_kg', 'date', 'description'
+            )
             
-            data['items'].append({
-                'id': item.id,
-                'name': item.name,
-                'description': item.description or '',
-                'quantity': item.quantity,
-                'quantity_kg': str(item.quantity_kg),
-                'movements': movements_list
-            })
-        
-        return JsonResponse(data)
+            # Tuples skip values()' per-row dict(zip()) and the item_id pop
+            grouped = defaultdict(list)
+            for item_id, mid, mtype, quantity, quantity_kg, date, description in movements:
+                grouped[item_id].append({
+                    'id': mid,
+                    'type': mtype,
+                    'quantity': quantity,
+                    'quantity_kg': quantity_kg,
+                    'date': date,
+                    'description': description,
+                })
+            for item in batch:
+                item['movements'] = grouped[item['id']]
+                yield item
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CreateWarehouseItemAPIView(LoginRequiredMixin, View):
+class CreateWarehouseItemAPIView(JsonAuthMixin, View):
     """Create a new warehouse item"""
     
+    @staff_required_json
+    @json_request_required
     def post(self, request):
-        if not request.user.is_staff:
-            if request.content_type == 'application/json':
-                return JsonResponse({'error': 'Not authorized'}, status=403)
-            return redirect('warehouse')
-        
         try:
-            # Check if it's form data or JSON
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                data = json.loads(request.body)
-                name = data.get('name', '').strip()
-                quantity = int(data.get('quantity', 0))
-                quantity_kg = Decimal(str(data.get('quantity_kg', 0)))
-                description = data.get('description', '').strip()
-            else:
-                # Form data
-                name = request.POST.get('name', '').strip()
-                quantity = int(request.POST.get('quantity', 0))
-                quantity_kg = Decimal(str(request.POST.get('quantity_kg', 0) or 0))
-                description = request.POST.get('description', '').strip()
-            
-            if not name:
-                if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                    return JsonResponse({'success': False, 'error': 'Name is required'}, status=400)
-                return redirect('warehouse')
-            
-            item = WarehouseItem.objects.create(
-                name=name,
-                quantity=quantity,
-                quantity_kg=quantity_kg,
-                description=description
+            data = load_json_object(request.body)
+            item = create_warehouse_item(
+                name=to_text(data, 'name'),
+                quantity=int(data.get('quantity', 0)),
+                quantity_kg=to_decimal(data.get('quantity_kg')),
+                description=to_text(data, 'description'),
             )
-            
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': True,
-                    'id': item.id,
-                    'name': item.name,
-                    'quantity': item.quantity,
-                })
-            return redirect('warehouse')
-        except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
-            return redirect('warehouse')
+            return json_ok({
+                'success': True,
+                'id': item.id,
+                'name': item.name,
+                'quantity': item.quantity,
+            })
+        except WAREHOUSE_INPUT_ERRORS as e:
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class WarehouseMovementAPIView(LoginRequiredMixin, View):
+class WarehouseMovementAPIView(JsonAuthMixin, View):
     """Add a warehouse movement (in/out)"""
     
+    @staff_required_json
+    @json_request_required
     def post(self, request):
-        if not request.user.is_staff:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
-        
         try:
-            # Check if it's form data or JSON
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                data = json.loads(request.body)
-                item_id = int(data.get('item_id'))
-                movement_type = data.get('type')  # 'in' or 'out'
-                quantity = int(data.get('quantity', 0))
-                quantity_kg = Decimal(str(data.get('quantity_kg', 0) or 0))
-                date = data.get('date', datetime.now().date())
-                description = data.get('description', '').strip()
-            else:
-                # Form data
-                item_id = int(request.POST.get('item_id'))
-                movement_type = request.POST.get('type')
-                quantity = int(request.POST.get('quantity', 0))
-                quantity_kg = Decimal(str(request.POST.get('quantity_kg', 0) or 0))
-                date = request.POST.get('date', str(datetime.now().date()))
-                description = request.POST.get('description', '').strip()
-            
-            if not item_id or not movement_type or (quantity <= 0 and quantity_kg <= 0):
-                if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                    return JsonResponse({'success': False, 'error': 'Invalid data'}, status=400)
-                return redirect('warehouse')
-            
-            if movement_type not in ['in', 'out']:
-                if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                    return JsonResponse({'success': False, 'error': 'Type must be "in" or "out"'}, status=400)
-                return redirect('warehouse')
-            
-            item = WarehouseItem.objects.get(id=item_id)
-            
-            # Create movement record
-            movement = WarehouseMovement.objects.create(
-                item=item,
-                type=movement_type,
-                quantity=quantity,
-                quantity_kg=quantity_kg,
-                date=date,
-                description=description
+            data = load_json_object(request.body)
+            movement, new_quantity = add_warehouse_movement(
+                item_id=int(data.get('item_id')),
+                movement_type=data.get('type'),  # 'in' or 'out'
+                quantity=int(data.get('quantity', 0)),
+                quantity_kg=to_decimal(data.get('quantity_kg')),
+                date=data.get('date', datetime.now().date()),
+                description=to_text(data, 'description'),
             )
-            
-            # Update item quantity and quantity_kg
-            if movement_type == 'in':
-                item.quantity += quantity
-                item.quantity_kg += quantity_kg
-            else:
-                item.quantity = max(0, item.quantity - quantity)
-                item.quantity_kg = max(Decimal('0'), item.quantity_kg - quantity_kg)
-            
-            item.save()
-            
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': True,
-                    'id': movement.id,
-                    'new_quantity': item.quantity,
-                })
-            return redirect('warehouse')
+            return json_ok({
+                'success': True,
+                'id': movement.id,
+                'new_quantity': new_quantity,
+            })
         except WarehouseItem.DoesNotExist:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({'error': 'Item not found'}, status=404)
-            return redirect('warehouse')
-        except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
-            return redirect('warehouse')
+            return json_err('Item not found', status=404)
+        except WAREHOUSE_INPUT_ERRORS as e:
+            return json_err(str(e))
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DeleteWarehouseMovementAPIView(LoginRequiredMixin, View):
+class DeleteWarehouseMovementAPIView(JsonAuthMixin, View):
     """Delete a warehouse movement"""
     
+    @staff_required_json
     def post(self, request, movement_id):
-        if not request.user.is_staff:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
-        
         try:
-            movement = WarehouseMovement.objects.get(id=movement_id)
-            item = movement.item
-            
-            # Reverse the quantity and quantity_kg update
-            if movement.type == 'in':
-                item.quantity -= movement.quantity
-                item.quantity_kg -= movement.quantity_kg
-            else:
-                item.quantity += movement.quantity
-                item.quantity_kg += movement.quantity_kg
-            
-            item.quantity = max(0, item.quantity)
-            item.quantity_kg = max(Decimal('0'), item.quantity_kg)
-            item.save()
-            
-            movement.delete()
-            
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': True,
-                    'new_quantity': item.quantity,
-                })
-            return redirect('warehouse')
+            new_quantity = delete_warehouse_movement(movement_id)
         except WarehouseMovement.DoesNotExist:
-            return JsonResponse({'error': 'Movement not found'}, status=404)
-        except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
-            return redirect('warehouse')
+            return json_err('Movement not found', status=404)
+        return json_ok({
+            'success': True,
+            'new_quantity': new_quantity,
+        })
 
 
-class DeleteWarehouseItemAPIView(LoginRequiredMixin, View):
+class DeleteWarehouseItemAPIView(JsonAuthMixin, View):
     """Delete a warehouse item"""
     
+    @staff_required_json
     def post(self, request, item_id):
-        if not request.user.is_staff:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
-        
-        try:
-            item = WarehouseItem.objects.get(id=item_id)
-            item.delete()
-            
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Item deleted successfully',
-                })
-            return redirect('warehouse')
-        except WarehouseItem.DoesNotExist:
-            return JsonResponse({'error': 'Item not found'}, status=404)
-        except Exception as e:
-            if request.content_type == 'application/json' or 'application/json' in request.META.get('CONTENT_TYPE', ''):
-                return JsonResponse({
-                    'success': False,
-                    'error': str(e),
-                }, status=400)
-            return redirect('warehouse')
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
-
-
-class UpdateWarehouseItemAPIView(LoginRequiredMixin, View):
+        deleted, _ = WarehouseItem.objects.filter(id=item_id).delete()
+        if not deleted:
+            return json_err('Item not found', status=404)
+        return json_ok({
+            'success': True,
+            'message': 'Item deleted successfully',
+        })
+
+
+class UpdateWarehouseItemAPIView(JsonAuthMixin, View):
     """Update a warehouse item"""
     
+    @staff_required_json
     def post(self, request, item_id):
-        if not request.user.is_staff:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
-        
         try:
-            item = WarehouseItem.objects.get(id=item_id)
-            data = json.loads(request.body)
+            data = load_json_object(request.body)
             
+            fields = {}
             if 'name' in data:
-                item.name = data['name']
+                fields['name'] = to_text(data, 'name')
+                if not fields['name']:
+                    raise ValueError('Name is required')
             if 'description' in data:
-                item.description = data['description']
+                fields['description'] = to_text(data, 'description')
             if 'quantity' in data:
-                item.quantity = int(data['quantity'])
+                fields['quantity'] = int(data['quantity'])
             if 'quantity_kg' in data:
-                item.quantity_kg = Decimal(str(data['quantity_kg']))
+                fields['quantity_kg'] = to_decimal(data['quantity_kg'])
             
-            item.save()
+            items = WarehouseItem.objects.filter(id=item_id)
+            if fields:
+                # One UPDATE with only the sent columns; no read-modify-write
+                if not items.update(**fields, updated_at=timezone.now()):
+                    raise WarehouseItem.DoesNotExist
+                # update() doesn't send post_save
+                invalidate_warehouse_items()
             
-            return JsonResponse({
+            item = items.values('id', 'name', 'description', 'quantity', 'quantity_kg').get()
+            return json_ok({
                 'success': True,
-                'item': {
-                    'id': item.id,
-                    'name': item.name,
-                    'description': item.description,
-                    'quantity': item.quantity,
-                    'quantity_kg': str(item.quantity_kg),
-                }
+                'item': item,
             })
         except WarehouseItem.DoesNotExist:
-            return JsonResponse({'error': 'Item not found'}, status=404)
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e),
-            }, status=400)
+            return json_err('Item not found', status=404)
+        except WAREHOUSE_INPUT_ERRORS as e:
+            return json_err(str(e))
 
 